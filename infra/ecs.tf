@@ -80,7 +80,12 @@ resource "aws_ecs_task_definition" "app" {
       portMappings = [{ containerPort = 8000 }]
       environment = [
         { name = "OSRM_HOST", value = "http://localhost:5000" },
-        { name = "REDIS_HOST", value = "localhost" }
+        { name = "REDIS_HOST", value = "localhost" },
+        # Publish the saturation signal to CloudWatch via awslogs (Embedded Metric Format)
+        { name = "SATURATION_EMF", value = "true" },
+        { name = "SERVICE_NAME", value = "eta-engine-service" },
+        # One worker per vCPU; models are loaded once and shared across workers
+        { name = "WORKERS", value = "2" }
       ]
       logConfiguration = {
         logDriver = "awslogs"
@@ -138,4 +143,45 @@ resource "aws_ecs_service" "app" {
     security_groups  = [aws_security_group.ecs_sg.id]
     assign_public_ip = true # Needed to pull images from ECR without a NAT Gateway
   }
-}
\ No newline at end of file
+
+  # desired_count is owned by the autoscaling policy below once the service exists
+  lifecycle {
+    ignore_changes = [desired_count]
+  }
+}
+
+# 6. Autoscaling (Scale on saturation, not CPU - the tasks are mostly waiting on OSRM/Redis I/O)
+resource "aws_appautoscaling_target" "app" {
+  service_namespace  = "ecs"
+  resource_id        = "service/${aws_ecs_cluster.main.name}/${aws_ecs_service.app.name}"
+  scalable_dimension = "ecs:service:DesiredCount"
+  min_capacity       = 1
+  max_capacity       = 10
+}
+
+# Mirrors scaling-policy.json: keep average saturation (in-flight, worker wait, p95 vs SLO) at 0.7
+resource "aws_appautoscaling_policy" "saturation" {
+  name               = "eta-engine-saturation"
+  policy_type        = "TargetTrackingScaling"
+  service_namespace  = aws_appautoscaling_target.app.service_namespace
+  resource_id        = aws_appautoscaling_target.app.resource_id
+  scalable_dimension = aws_appautoscaling_target.app.scalable_dimension
+
+  target_tracking_scaling_policy_configuration {
+    target_value       = 0.7
+    scale_out_cooldown = 60
+    scale_in_cooldown  = 60
+
+    customized_metric_specification {
+      metric_name = "Saturation"
+      namespace   = "ETAEngine"
+      statistic   = "Average"
+      unit        = "None"
+
+      dimensions {
+        name  = "ServiceName"
+        value = aws_ecs_service.app.name
+      }
+    }
+  }
+}
@@ -4,74 +4,199 @@ import time
 import requests
 import uvicorn
 import numpy as np
-import redis 
-import onnxruntime as ort
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from contextlib import asynccontextmanager
 from pydantic import BaseModel
+from typing import List
 from prometheus_fastapi_instrumentator import Instrumentator
 from prometheus_client import Gauge
 
 
 from src.schemas import OrderRequest, ETAResponse
+from src.cache import TTLCache, quantize
+from src.capture import RequestCapture
+from src.feature_store import ShardedRedis
+from src.saturation import SaturationMonitor, SaturationMiddleware
+from src.model_registry import ModelRegistry
+from src.resilience import AdmissionLimiter, AdmissionMiddleware, CircuitBreaker, Deadline, DEGRADED
 
 print("🚀 -------------------------------------------------")
 print("🚀 STARTING NEW VERSION (With Clean Paths)")
 print("🚀 -------------------------------------------------")
 # --- Configuration ---
 OSRM_HOST = os.getenv("OSRM_HOST", "http://localhost:5000")
-REDIS_HOST = os.getenv("REDIS_HOST", "localhost") 
-REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
+# Redis nodes are read from REDIS_NODES (or REDIS_HOST/REDIS_PORT) in src/feature_store.py
 
-# Models Dictionary
-models = {}
-redis_client = None
+# Response cache (off by default): repeat quotes within the TTL are served from memory
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "false").lower() == "true"
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", 5))
+ROUTE_CACHE_TTL = float(os.getenv("ROUTE_CACHE_TTL", 300))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", 10000))
+COORD_PRECISION = int(os.getenv("COORD_PRECISION", 4))
+
+# Request capture (off by default): sampled /predict bodies for src/replay.py
+CAPTURE_ENABLED = os.getenv("CAPTURE_ENABLED", "false").lower() == "true"
+CAPTURE_FILE = os.getenv("CAPTURE_FILE", "captures/predict_capture.jsonl")
+CAPTURE_SAMPLE_RATE = float(os.getenv("CAPTURE_SAMPLE_RATE", 0.1))
+
+OSRM_FALLBACK = (5000.0, 900.0) # Default physics when OSRM is unreachable
+
+# Model registry: onnx_manifest.json is polled and new versions hot-swapped in
+MODEL_MANIFEST = os.getenv("MODEL_MANIFEST", "onnx_manifest.json")
+MANIFEST_POLL_SECONDS = float(os.getenv("MANIFEST_POLL_SECONDS", 10))
+MODEL_VERSIONS_KEPT = int(os.getenv("MODEL_VERSIONS_KEPT", 2)) # Previous versions held for rollback
+
+# Admission control & degraded mode
+REQUEST_DEADLINE_MS = float(os.getenv("REQUEST_DEADLINE_MS", 500))   # Budget per /predict, queue time included
+MAX_CONCURRENT_REQUESTS = int(os.getenv("MAX_CONCURRENT_REQUESTS", 32)) # Keep below the threadpool size (40)
+MAX_QUEUED_REQUESTS = int(os.getenv("MAX_QUEUED_REQUESTS", 64))      # Beyond this we answer 503 straight away
+OSRM_TIMEOUT = float(os.getenv("OSRM_TIMEOUT", 2.0))
+OSRM_MIN_BUDGET_MS = float(os.getenv("OSRM_MIN_BUDGET_MS", 50))      # Skip OSRM if less budget than this is left
+REDIS_TIMEOUT = float(os.getenv("REDIS_TIMEOUT", 0.1))
+# Never start a Redis call that its socket timeout could push past the deadline
+REDIS_MIN_BUDGET_MS = max(float(os.getenv("REDIS_MIN_BUDGET_MS", 0)), REDIS_TIMEOUT * 1000)
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", 5))
+BREAKER_RESET_SECONDS = float(os.getenv("BREAKER_RESET_SECONDS", 10))
+
+# Models Registry (registry.active is the ModelVersion serving right now)
+model_registry = ModelRegistry(MODEL_MANIFEST, MODEL_VERSIONS_KEPT, MANIFEST_POLL_SECONDS)
+redis_client = None # ShardedRedis: one pooled client per node, routed by restaurant_id
+
+# Full ETA responses (short TTL) and OSRM routes (road network rarely changes)
+response_cache = TTLCache("response", CACHE_MAX_ENTRIES, RESPONSE_CACHE_TTL)
+route_cache = TTLCache("route", CACHE_MAX_ENTRIES, ROUTE_CACHE_TTL)
+
+request_capture = RequestCapture(CAPTURE_FILE, CAPTURE_SAMPLE_RATE)
+
+# One breaker per dependency; last good load per restaurant for degraded answers
+osrm_breaker = CircuitBreaker("osrm", BREAKER_FAILURES, BREAKER_RESET_SECONDS)
+redis_breaker = CircuitBreaker("redis", BREAKER_FAILURES, BREAKER_RESET_SECONDS)
+last_known_load = TTLCache("last_load", CACHE_MAX_ENTRIES, 1200) # Same horizon as the 20 min window
+
+# Autoscaling signal: in-flight, worker wait and rolling p95 (see src/saturation.py)
+saturation_monitor = SaturationMonitor()
 
 # --- New Schema for Simulation ---
 class TrafficSimulation(BaseModel):
     restaurant_id: str
     orders_added: int
 
+class LoadQuery(BaseModel):
+    restaurant_ids: List[str]
+
 # --- Helper Functions ---
-def get_restaurant_load(restaurant_id: str) -> int:
-    """Queries Redis for the last 4 buckets (20 mins) + Simulated Load."""
+def load_keys(restaurant_id: str, current_ts: int):
+    """Keys for the last 4 buckets (20 mins) + the simulated load key."""
+    bucket_size = 300
+    current_bucket = (current_ts // bucket_size) * bucket_size
+
+    # 1. Real Traffic (Time Buckets)
+    keys = [f"load:{restaurant_id}:{current_bucket - (i * bucket_size)}" for i in range(4)]
+
+    # 2. Simulated Traffic (The key we inject during testing)
+    keys.append(f"simulation:{restaurant_id}")
+    return keys
+
+def fetch_restaurant_load(restaurant_id: str) -> int:
+    """Queries Redis for the last 4 buckets (20 mins) + Simulated Load. Raises on Redis errors."""
     if not redis_client:
         return 0
-    try:
-        current_ts = int(time.time())
-        bucket_size = 300
-        current_bucket = (current_ts // bucket_size) * bucket_size
-        
-        # 1. Get Real Traffic (Time Buckets)
-        keys = []
-        for i in range(4):
-            t = current_bucket - (i * bucket_size)
-            keys.append(f"load:{restaurant_id}:{t}")
-        
-        # 2. Get Simulated Traffic (The key we inject during testing)
-        sim_key = f"simulation:{restaurant_id}"
-        keys.append(sim_key)
-
-        values = redis_client.mget(keys)
-        
-        # Sum up all valid numbers
-        total_load = sum([int(v) for v in values if v is not None])
-        return total_load
+    keys = load_keys(restaurant_id, int(time.time()))
+    values = redis_client.client_for(restaurant_id).mget(keys)
 
-    except Exception as e:
-        print(f"⚠️ Redis Read Error: {e}")
-        return 0
+    # Sum up all valid numbers
+    return sum([int(v) for v in values if v is not None])
+
+def get_live_load(restaurant_id: str, deadline: Deadline):
+    """Returns (active_orders, degraded_reason). Falls back to the last known load."""
+    if deadline.remaining_ms() < REDIS_MIN_BUDGET_MS:
+        reason = "deadline"
+    elif not redis_breaker.allow():
+        reason = "breaker_open"
+    else:
+        try:
+            load = fetch_restaurant_load(restaurant_id)
+            redis_breaker.record_success()
+            last_known_load.put(restaurant_id, load)
+            return load, None
+        except Exception as e:
+            print(f"⚠️ Redis Read Error: {e}")
+            redis_breaker.record_failure()
+            reason = "error"
+
+    DEGRADED.labels("redis", reason).inc()
+    load = last_known_load.get(restaurant_id)
+    return (load if load is not None else 0), reason
+
+def get_restaurant_loads(restaurant_ids) -> dict:
+    """Batch version of fetch_restaurant_load: one pipelined round-trip per shard. Raises on Redis errors."""
+    if not redis_client:
+        return {r_id: 0 for r_id in restaurant_ids}
+    current_ts = int(time.time())
+    values = redis_client.mget_per_restaurant({r_id: load_keys(r_id, current_ts) for r_id in restaurant_ids})
+    return {r_id: sum(int(v) for v in vals if v is not None) for r_id, vals in values.items()}
+
+def route_cache_key(start_coords, end_coords):
+    return tuple(quantize(c, COORD_PRECISION) for c in (*start_coords, *end_coords))
+
+def response_cache_key(req: OrderRequest, active_orders: int, model_version: str):
+    """Every input that changes the answer. active_orders and the model version are
+    part of the key, so a load change or a model swap naturally misses old entries."""
+    return (
+        req.restaurant_id, req.items_count, req.cuisine_complexity, req.rider_supply_index,
+        route_cache_key((req.start_lon, req.start_lat), (req.end_lon, req.end_lat)),
+        req.hour_of_day, req.day_of_week, active_orders, model_version
+    )
+
+def get_live_physics(start_coords, end_coords, deadline: Deadline):
+    """
+    Returns ((distance, duration), degraded_reason).
+    OSRM is skipped when the breaker is open or the budget is nearly spent;
+    we then answer from the route cache, or the default physics.
+    """
+    key = route_cache_key(start_coords, end_coords)
+    if RESPONSE_CACHE_ENABLED:
+        physics = route_cache.get(key)
+        if physics is not None:
+            return physics, None
 
-def get_osm_physics(start_coords, end_coords):
+    remaining_ms = deadline.remaining_ms()
+    if remaining_ms < OSRM_MIN_BUDGET_MS:
+        reason = "deadline"
+    elif not osrm_breaker.allow():
+        reason = "breaker_open"
+    else:
+        try:
+            physics = get_osm_physics(start_coords, end_coords, timeout=min(OSRM_TIMEOUT, remaining_ms / 1000))
+            # OSRM answered: a "no route" reply is about the coordinates, not OSRM's health
+            osrm_breaker.record_success()
+            if physics is not None:
+                route_cache.put(key, physics)
+                return physics, None
+            reason = "no_route"
+        except Exception as e:
+            print(f"OSRM Connection Error: {e}")
+            osrm_breaker.record_failure()
+            reason = "error"
+
+    DEGRADED.labels("osrm", reason).inc()
+    physics = route_cache.get(key)
+    return (physics if physics is not None else OSRM_FALLBACK), reason
+
+def get_osm_physics(start_coords, end_coords, timeout=OSRM_TIMEOUT):
+    """
+    Returns (distance, duration), or None when OSRM answers but has no route
+    (4xx such as NoRoute / InvalidQuery). Raises on connection errors, timeouts
+    and 5xx, which are the failures the circuit breaker should count.
+    """
     url = f"{OSRM_HOST}/route/v1/driving/{start_coords[0]},{start_coords[1]};{end_coords[0]},{end_coords[1]}"
-    try:
-        resp = requests.get(url, params={"overview": "false"}, timeout=2.0)    
-        if resp.status_code == 200 and resp.json()["code"] == "Ok":
-            route = resp.json()["routes"][0]
-            return route["distance"], route["duration"]
-    except Exception as e:
-        print(f"OSRM Connection Error: {e}")
-    return 5000.0, 900.0 # Fallback default
+    resp = requests.get(url, params={"overview": "false"}, timeout=timeout)
+    if resp.status_code >= 500:
+        raise requests.HTTPError(f"OSRM returned {resp.status_code}", response=resp)
+    if resp.status_code == 200 and resp.json()["code"] == "Ok":
+        route = resp.json()["routes"][0]
+        return route["distance"], route["duration"]
+    return None
 
 def estimate_traffic_factor(hour_of_day: float) -> float:
     morning_peak = 0.4 * np.exp(-0.5 * ((hour_of_day - 9) / 2) ** 2)
@@ -81,6 +206,17 @@ def estimate_traffic_factor(hour_of_day: float) -> float:
 # --- DEBUG ENDPOINT (Add this to see inside the container) ---
 
 
+def load_models(intra_op_threads: int = 0):
+    """
+    Loads the version described by the manifest. intra_op_threads=0 keeps ORT's default
+    pool; src/serve.py passes 1 so sessions built before fork own no threads.
+    """
+    try:
+        model_registry.load_initial(intra_op_threads)
+    except Exception as e:
+        print(f"❌ Error loading models: {e}")
+        print(f"   (Files in folder: {os.listdir('.')})")
+
 # --- Lifespan ---
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -89,44 +225,40 @@ async def lifespan(app: FastAPI):
     # 1. Connect to Redis
     global redis_client
     try:
-        redis_client = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, decode_responses=True)
+        redis_client = ShardedRedis.from_env(
+            decode_responses=True, socket_timeout=REDIS_TIMEOUT, socket_connect_timeout=REDIS_TIMEOUT
+        )
         redis_client.ping()
-        print(f"✅ Connected to Redis at {REDIS_HOST}")
+        print(f"✅ Connected to Redis at {redis_client}")
     except Exception as e:
         print(f"❌ Redis Connection Failed: {e}")
 
-    # 2. Load ONNX Models (Direct Load - No Manifest)
-    # This forces the app to look in the current folder.
-    model_files = {
-        "cooking": "cooking.onnx",
-        "allocation": "allocation.onnx",
-        "delivery": "delivery.onnx"
-    }
+    # 2. Load ONNX Models (already done before fork when served by src/serve.py)
+    if model_registry.active is None:
+        load_models()
+    model_registry.start_watching()
 
-    for name, filename in model_files.items():
-        print(f"🔹 Attempting to load {name} from ./{filename}...")
-        try:
-            if os.path.exists(filename):
-                # Load the model
-                session = ort.InferenceSession(filename)
-                models[name] = session
-                print(f"✅ {name} LOADED SUCCESSFULLY!")
-            else:
-                print(f"❌ CRITICAL: File not found: {filename}")
-                # List files to see what IS there
-                print(f"   (Files in folder: {os.listdir('.')})")
-        except Exception as e:
-            print(f"❌ Error loading {name}: {e}")
+    # 3. Start Request Capture
+    if CAPTURE_ENABLED:
+        request_capture.start()
+
+    # 4. Start Saturation Signal
+    saturation_monitor.start()
 
     yield
+    request_capture.stop()
     print("Shutting down...")
 
 app = FastAPI(title="ETA Prediction Engine", lifespan=lifespan)
+# Last added runs first: saturation sees queued requests, admission guards the workers
+app.add_middleware(AdmissionMiddleware, limiter=AdmissionLimiter(MAX_CONCURRENT_REQUESTS, MAX_QUEUED_REQUESTS),
+                   budget_ms=REQUEST_DEADLINE_MS)
+app.add_middleware(SaturationMiddleware, monitor=saturation_monitor)
 
 
 Instrumentator().instrument(app).expose(app)
 
-TRAFFIC_GAUGE = Gauge('eta_traffic_factor', 'Current Traffic Factor detected by the system')
+TRAFFIC_GAUGE = Gauge('eta_traffic_factor', 'Current Traffic Factor detected by the system', multiprocess_mode='mostrecent')
 
 @app.get("/debug_files")
 def debug_files():
@@ -135,13 +267,15 @@ def debug_files():
     manifest_exists = os.path.exists("onnx_manifest.json")
     
     # Check if models are loaded
-    loaded_models = list(models.keys())
+    active = model_registry.active
+    loaded_models = list(active.sessions.keys()) if active else []
     
     return {
         "current_directory": os.getcwd(),
         "files_present": files,
         "manifest_found": manifest_exists,
-        "models_loaded": loaded_models
+        "models_loaded": loaded_models,
+        "model_versions": model_registry.versions()
     }
 # --- NEW ENDPOINT: Simulate Traffic ---
 @app.post("/simulate_traffic")
@@ -150,24 +284,94 @@ def simulate_traffic(payload: TrafficSimulation):
     if not redis_client:
         raise HTTPException(status_code=503, detail="Redis unavailable")
     
-    # We write to a special 'simulation' key that get_restaurant_load reads
+    # We write to a special 'simulation' key that fetch_restaurant_load reads
     key = f"simulation:{payload.restaurant_id}"
-    redis_client.set(key, payload.orders_added, ex=1200) # Expires in 20 mins
+    redis_client.client_for(payload.restaurant_id).set(key, payload.orders_added, ex=1200) # Expires in 20 mins
     
     return {"message": f"Injected {payload.orders_added} fake orders for {payload.restaurant_id}"}
 
+# --- Live Load for Many Restaurants (dashboards / dispatch) ---
+@app.post("/restaurant_loads")
+def restaurant_loads(payload: LoadQuery):
+    """Active orders (last 20 mins) per restaurant, read with one pipeline per Redis shard."""
+    if not redis_client or not redis_breaker.allow():
+        raise HTTPException(status_code=503, detail="Redis unavailable")
+    try:
+        loads = get_restaurant_loads(payload.restaurant_ids)
+    except Exception as e:
+        # A zero here would look like an idle kitchen to dashboards and dispatch
+        print(f"⚠️ Redis Read Error: {e}")
+        redis_breaker.record_failure()
+        raise HTTPException(status_code=503, detail="Redis unavailable")
+    redis_breaker.record_success()
+    return loads
+
+# --- Model Versions ---
+@app.get("/models")
+def model_versions():
+    return model_registry.versions()
+
+@app.post("/models/rollback")
+def rollback_model():
+    """
+    Points onnx_manifest.json back at the previous (still loaded and warm) version.
+    Every worker picks it up on its next manifest poll.
+    """
+    version = model_registry.request_rollback()
+    if version is None:
+        raise HTTPException(status_code=409, detail="No previous model version loaded")
+    return {"rolling_back_to": version, "within_seconds": MANIFEST_POLL_SECONDS}
+
 # --- Prediction Endpoint ---
 
 @app.post("/predict", response_model=ETAResponse)
-def predict_eta(req: OrderRequest):
-    if not models:
+def predict_eta(req: OrderRequest, request: Request):
+    start = time.perf_counter()
+    # Sync endpoint: the gap since the middleware saw the request is threadpool queueing
+    wait_sec = start - request.state.arrived_at
+    saturation_monitor.record_wait(wait_sec * 1000)
+    arrived_at = time.time() - wait_sec # Wall-clock arrival, for the request capture
+    status = 200
+    try:
+        return compute_eta(req, request.state.deadline)
+    except HTTPException as e:
+        status = e.status_code
+        raise
+    except Exception:
+        status = 500
+        raise
+    finally:
+        request_capture.record(req, arrived_at, (time.perf_counter() - request.state.arrived_at) * 1000, status)
+
+def compute_eta(req: OrderRequest, deadline: Deadline) -> ETAResponse:
+    # Pin one version for the whole request; a hot swap only affects later requests
+    active = model_registry.active
+    if active is None:
         raise HTTPException(status_code=503, detail="Models are not loaded.")
     
-    # 1. Get Live Data
-    active_orders = get_restaurant_load(req.restaurant_id)
+    # 1. Get Live Data (last known load if Redis is slow/down)
+    degraded = {}
+    active_orders, reason = get_live_load(req.restaurant_id, deadline)
+    if reason:
+        degraded["redis"] = reason
+
+    if RESPONSE_CACHE_ENABLED:
+        cache_key = response_cache_key(req, active_orders, active.version)
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            # Cached answers are full-fidelity; report how *this* request got its load
+            return ETAResponse(**{**cached, "live_context": {
+                **cached["live_context"],
+                "cache_hit": True,
+                "data_source": "Last Known Load" if "redis" in degraded else "Redis Real-Time Store",
+                "degraded": bool(degraded),
+                "degraded_reasons": dict(degraded)
+            }})
     
     # 2. Physics & Traffic
-    dist, duration = get_osm_physics((req.start_lon, req.start_lat), (req.end_lon, req.end_lat))
+    (dist, duration), reason = get_live_physics((req.start_lon, req.start_lat), (req.end_lon, req.end_lat), deadline)
+    if reason:
+        degraded["osrm"] = reason
     traffic_factor = estimate_traffic_factor(req.hour_of_day)
 
     TRAFFIC_GAUGE.set(traffic_factor)
@@ -175,29 +379,23 @@ def predict_eta(req: OrderRequest):
     
     # A. Cooking
     input_cook = np.array([[req.items_count, req.cuisine_complexity, req.hour_of_day, req.day_of_week]], dtype=np.float32)
-    input_name = models['cooking'].get_inputs()[0].name
-    # 👇 FIX HERE: Add .item()
-    base_cooking_sec = models['cooking'].run(None, {input_name: input_cook})[0][0].item()
+    base_cooking_sec = active.run('cooking', input_cook)
     
     kitchen_delay = active_orders * 120.0 
     final_cooking_sec = base_cooking_sec + kitchen_delay
 
     # B. Allocation
     input_alloc = np.array([[req.rider_supply_index, req.hour_of_day, req.day_of_week]], dtype=np.float32)
-    input_name = models['allocation'].get_inputs()[0].name
-    # 👇 FIX HERE: Add .item()
-    alloc_sec = models['allocation'].run(None, {input_name: input_alloc})[0][0].item()
+    alloc_sec = active.run('allocation', input_alloc)
 
     # C. Delivery
     input_deliv = np.array([[dist, duration, traffic_factor, req.hour_of_day]], dtype=np.float32)
-    input_name = models['delivery'].get_inputs()[0].name
-    # 👇 FIX HERE: Add .item()
-    travel_sec = models['delivery'].run(None, {input_name: input_deliv})[0][0].item()
+    travel_sec = active.run('delivery', input_deliv)
 
     # 4. Total
     total = final_cooking_sec + alloc_sec + travel_sec
 
-    return ETAResponse(
+    result = dict(
         breakdown={
             "cooking_seconds": int(base_cooking_sec),
             "kitchen_delay_seconds": int(kitchen_delay),
@@ -213,6 +411,14 @@ def predict_eta(req: OrderRequest):
         live_context={
             "restaurant_id": req.restaurant_id,
             "active_orders_last_20m": active_orders,
-            "data_source": "Redis Real-Time Store"
+            "data_source": "Last Known Load" if "redis" in degraded else "Redis Real-Time Store",
+            "degraded": bool(degraded),
+            "degraded_reasons": degraded,
+            "model_version": active.version
         }
-    )
\ No newline at end of file
+    )
+    # Only cache full-fidelity answers
+    if RESPONSE_CACHE_ENABLED and not degraded:
+        response_cache.put(cache_key, result)
+
+    return ETAResponse(**result)
\ No newline at end of file
@@ -0,0 +1,53 @@
+import time
+import threading
+from collections import OrderedDict
+from prometheus_client import Counter, Gauge
+
+CACHE_LOOKUPS = Counter('eta_cache_lookups_total', 'Cache lookups by entry type and result', ['entry_type', 'result'])
+CACHE_SIZE = Gauge('eta_cache_entries', 'Entries currently held in the cache', ['entry_type'], multiprocess_mode='livesum')
+
+
+class TTLCache:
+    """Bounded in-memory LRU cache whose entries expire after ttl_seconds."""
+
+    def __init__(self, entry_type: str, max_entries: int, ttl_seconds: float):
+        self.entry_type = entry_type
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data = OrderedDict()
+        self._lock = threading.Lock()  # predict_eta runs in FastAPI's threadpool
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and item[0] > now:
+                self._data.move_to_end(key)
+                CACHE_LOOKUPS.labels(self.entry_type, 'hit').inc()
+                return item[1]
+            if item is not None:
+                del self._data[key]
+                CACHE_LOOKUPS.labels(self.entry_type, 'expired').inc()
+            else:
+                CACHE_LOOKUPS.labels(self.entry_type, 'miss').inc()
+            CACHE_SIZE.labels(self.entry_type).set(len(self._data))
+        return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._data.move_to_end(key)
+            # Evict least recently used entries to stay within the memory bound
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+            CACHE_SIZE.labels(self.entry_type).set(len(self._data))
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            CACHE_SIZE.labels(self.entry_type).set(0)
+
+
+def quantize(value: float, precision: int) -> float:
+    """Rounds a coordinate so nearby points share a key (4 decimals ~ 11m)."""
+    return round(value, precision)
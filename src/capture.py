@@ -0,0 +1,67 @@
+import json
+import os
+import queue
+import random
+import threading
+from prometheus_client import Counter
+
+CAPTURE_DROPPED = Counter('eta_capture_dropped_total', 'Captured requests dropped because the writer queue was full')
+
+
+def worker_path(path: str, pid: int) -> str:
+    """captures/predict_capture.jsonl -> captures/predict_capture.<pid>.jsonl"""
+    root, ext = os.path.splitext(path)
+    return f"{root}.{pid}{ext}"
+
+
+class RequestCapture:
+    """Samples /predict bodies + timings and appends them to a JSONL file.
+
+    The request thread only does a random() and a non-blocking put; a daemon
+    thread owns the file and does all serialization and I/O.
+    Each process writes its own file (see worker_path): buffered writers from
+    several gunicorn workers sharing one file would interleave mid-line.
+    """
+
+    def __init__(self, path: str, sample_rate: float, max_queue: int = 10000):
+        self.base_path = path
+        self.path = None # Set in start(), which runs in the worker after fork
+        self.sample_rate = sample_rate
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+
+    def start(self):
+        self.path = worker_path(self.base_path, os.getpid())
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._thread = threading.Thread(target=self._writer, name="request-capture", daemon=True)
+        self._thread.start()
+        print(f"🎙️ Capturing {self.sample_rate:.0%} of /predict traffic to {self.path}")
+
+    def record(self, req, arrived_at: float, latency_ms: float, status: int):
+        """
+        req is the pydantic request; it is only dumped once the sample is taken.
+        arrived_at is the wall-clock arrival time, so replay keeps the real arrival pattern.
+        """
+        if self._thread is None or random.random() >= self.sample_rate:
+            return
+        try:
+            self._queue.put_nowait({"ts": arrived_at, "latency_ms": latency_ms, "status": status, "body": req.model_dump()})
+        except queue.Full:
+            CAPTURE_DROPPED.inc() # Never block a request on the capture file
+
+    def stop(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _writer(self):
+        with open(self.path, "a", encoding="utf-8") as f:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+                f.write(json.dumps(item) + "\n")
+                # Flush when we catch up so the file is usable while the app runs
+                if self._queue.empty():
+                    f.flush()
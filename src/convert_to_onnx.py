@@ -1,9 +1,24 @@
 import json
 import os
+import time
 import xgboost as xgb
 import onnxmltools
 from onnxmltools.convert.common.data_types import FloatTensorType
 
+# Every conversion gets its own models/<version>/ folder: files a running (or
+# rolled back) version points at are never overwritten
+MODELS_DIR = "models"
+
+def export_booster(booster, num_features, target_filename):
+    """Converts an XGBoost Booster to ONNX and saves it to target_filename."""
+    # Sanitize Feature Names (Fixes "Unable to interpret feature name" error)
+    booster.feature_names = [f"f{i}" for i in range(num_features)]
+
+    initial_type = [('float_input', FloatTensorType([None, num_features]))]
+    onnx_model = onnxmltools.convert_xgboost(booster, initial_types=initial_type)
+    onnxmltools.utils.save_model(onnx_model, target_filename)
+    return target_filename
+
 def convert_models():
     print("🔄 Starting ONNX Conversion & Extraction...")
     
@@ -16,7 +31,7 @@ def convert_models():
         manifest = json.load(f)
 
     # 2. Configuration: Map Experiment Names to Clean Filenames
-    # This keeps the files in the root folder so Docker can find them easily.
+    # Saved under models/<version>/, which the Dockerfile copies as a whole.
     model_config = {
         "ETA_Cooking_Prediction": {
             "features": 4, 
@@ -32,7 +47,12 @@ def convert_models():
         }
     }
 
+    version = time.strftime("%Y%m%d-%H%M%S")
+    version_dir = os.path.join(MODELS_DIR, version)
+    os.makedirs(version_dir, exist_ok=True)
+
     new_manifest = {}
+    failed = []
 
     for name, path in manifest.items():
         if name not in model_config:
@@ -46,18 +66,9 @@ def convert_models():
             booster = xgb.Booster()
             booster.load_model(path)
             
-            # B. Sanitize Feature Names (Fixes "Unable to interpret feature name" error)
-            num_features = model_config[name]["features"]
-            generic_names = [f"f{i}" for i in range(num_features)]
-            booster.feature_names = generic_names
-            
-            # C. Convert to ONNX
-            initial_type = [('float_input', FloatTensorType([None, num_features]))]
-            onnx_model = onnxmltools.convert_xgboost(booster, initial_types=initial_type)
-
-            # D. Save to ROOT FOLDER (Crucial for Docker!)
-            target_filename = model_config[name]["filename"]
-            onnxmltools.utils.save_model(onnx_model, target_filename)
+            # B-D. Sanitize names, convert and save to this version's folder
+            target_filename = os.path.join(version_dir, model_config[name]["filename"])
+            export_booster(booster, model_config[name]["features"], target_filename)
             
             # E. Update Manifest to point to local file
             new_manifest[name] = target_filename
@@ -65,15 +76,24 @@ def convert_models():
             
         except Exception as e:
             print(f"❌ Failed to convert {name}: {e}")
+            failed.append(name)
+
+    # A partial manifest would be hot-swapped into running services; keep the old one
+    if failed or len(new_manifest) != len(model_config):
+        print(f"\n❌ Not writing onnx_manifest.json: {', '.join(failed) or 'missing models'} failed.")
+        return
 
     # 3. Save the new 'Docker-Ready' Manifest
-    with open("onnx_manifest.json", "w") as f:
+    # A new version makes running services hot-swap the models (see src/model_registry.py)
+    new_manifest["version"] = version
+    # Write-then-rename: a watcher polling mid-write must never see a truncated manifest
+    with open("onnx_manifest.json.tmp", "w") as f:
         json.dump(new_manifest, f, indent=4)
+    os.replace("onnx_manifest.json.tmp", "onnx_manifest.json")
     
-    print("\n📋 Success! Files created in root directory:")
-    print("   - cooking.onnx")
-    print("   - allocation.onnx")
-    print("   - delivery.onnx")
+    print(f"\n📋 Success! Version {version} created:")
+    for config in model_config.values():
+        print(f"   - {os.path.join(version_dir, config['filename'])}")
     print("   - onnx_manifest.json")
 
 if __name__ == "__main__":
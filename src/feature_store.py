@@ -0,0 +1,87 @@
+import bisect
+import hashlib
+import os
+from collections import defaultdict
+import redis
+
+# Comma-separated "host:port" list. Falls back to the single REDIS_HOST/REDIS_PORT node.
+REDIS_NODES = os.getenv("REDIS_NODES", "")
+REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
+REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
+VIRTUAL_NODES = 160 # Points per node on the ring; evens out the key spread
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.md5(value.encode("utf-8")).digest()[:8], "big")
+
+
+def parse_nodes(spec: str):
+    nodes = []
+    for item in spec.split(","):
+        item = item.strip()
+        if item:
+            host, _, port = item.partition(":")
+            nodes.append((host, int(port or 6379)))
+    return nodes or [(REDIS_HOST, REDIS_PORT)]
+
+
+class ShardedRedis:
+    """
+    Client-side sharding over several Redis nodes.
+    Keys are placed by consistent hashing on restaurant_id, so every
+    load:{restaurant_id}:* bucket and simulation:{restaurant_id} lives on one shard
+    and adding a node only moves ~1/N of the restaurants.
+    """
+
+    def __init__(self, nodes, **redis_kwargs):
+        self.nodes = list(nodes)
+        # One pooled client per node, shared by all request threads
+        self.clients = [
+            redis.Redis(connection_pool=redis.ConnectionPool(host=host, port=port, **redis_kwargs))
+            for host, port in self.nodes
+        ]
+        ring = sorted(
+            (_hash(f"{host}:{port}#{v}"), i)
+            for i, (host, port) in enumerate(self.nodes)
+            for v in range(VIRTUAL_NODES)
+        )
+        self._ring_hashes = [h for h, _ in ring]
+        self._ring_nodes = [i for _, i in ring]
+
+    @classmethod
+    def from_env(cls, **redis_kwargs):
+        return cls(parse_nodes(REDIS_NODES), **redis_kwargs)
+
+    def shard_index(self, restaurant_id: str) -> int:
+        pos = bisect.bisect(self._ring_hashes, _hash(restaurant_id)) % len(self._ring_hashes)
+        return self._ring_nodes[pos]
+
+    def client_for(self, restaurant_id: str) -> redis.Redis:
+        return self.clients[self.shard_index(restaurant_id)]
+
+    def ping(self):
+        for client in self.clients:
+            client.ping()
+        return True
+
+    def group_by_shard(self, restaurant_ids):
+        groups = defaultdict(list)
+        for r_id in restaurant_ids:
+            groups[self.shard_index(r_id)].append(r_id)
+        return groups
+
+    def mget_per_restaurant(self, keys_by_restaurant):
+        """
+        Reads many restaurants at once: one pipeline (one round-trip) per shard,
+        with one MGET per restaurant inside it. Returns {restaurant_id: values}.
+        """
+        results = {}
+        for index, r_ids in self.group_by_shard(keys_by_restaurant).items():
+            pipe = self.clients[index].pipeline(transaction=False)
+            for r_id in r_ids:
+                pipe.mget(keys_by_restaurant[r_id])
+            results.update(zip(r_ids, pipe.execute()))
+        return results
+
+    def __repr__(self):
+        return ", ".join(f"{host}:{port}" for host, port in self.nodes)
@@ -0,0 +1,232 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import deque
+import numpy as np
+import onnxruntime as ort
+from prometheus_client import Counter, Gauge
+
+# onnx_manifest.json keys (written by src/convert_to_onnx.py) -> names used by the app
+MANIFEST_STAGES = {
+    "ETA_Cooking_Prediction": "cooking",
+    "ETA_Allocation_Prediction": "allocation",
+    "ETA_LastMile_Prediction": "delivery"
+}
+# Used when there is no manifest (the original hardcoded layout)
+DEFAULT_FILES = {
+    "cooking": "cooking.onnx",
+    "allocation": "allocation.onnx",
+    "delivery": "delivery.onnx"
+}
+WARMUP_RUNS = 50
+
+ACTIVE_VERSION = Gauge('eta_model_active', 'Serving model version (1 = active)', ['version'], multiprocess_mode='livemax')
+MODEL_SWAPS = Counter('eta_model_swaps_total', 'Model version changes', ['kind'])
+
+
+def session_options(intra_op_threads: int = 0) -> ort.SessionOptions:
+    """ORT options for serving; 0 keeps ORT's default thread pools."""
+    options = ort.SessionOptions()
+    if intra_op_threads:
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = 1
+    return options
+
+
+class ModelVersion:
+    """An immutable, fully warmed set of the three stage sessions."""
+
+    def __init__(self, version: str, sessions: dict, files: dict):
+        self.version = version
+        self.sessions = sessions
+        self.files = files # stage -> path, used to point the manifest back here on rollback
+        self.input_names = {name: s.get_inputs()[0].name for name, s in sessions.items()}
+        self.loaded_at = time.time()
+
+    def run(self, name: str, features: np.ndarray) -> float:
+        return self.sessions[name].run(None, {self.input_names[name]: features})[0][0].item()
+
+    def warm_up(self, runs: int = WARMUP_RUNS):
+        """First runs allocate ORT buffers; do them here, not on live requests."""
+        for name, session in self.sessions.items():
+            num_features = session.get_inputs()[0].shape[1]
+            features = np.zeros((1, num_features), dtype=np.float32)
+            for _ in range(runs):
+                self.run(name, features)
+
+
+class ModelRegistry:
+    """
+    Loads model versions described by onnx_manifest.json and swaps them in atomically.
+
+    Requests take `registry.active` once and use that object to the end, so a swap
+    (a single reference assignment) never affects a request already in flight.
+    Previous versions stay loaded for instant rollback.
+
+    The manifest is the single source of truth: with several workers each one
+    watches it, so rollbacks are done by rewriting it too (request_rollback).
+    """
+
+    def __init__(self, manifest_path: str, keep_versions: int = 2, poll_seconds: float = 10.0):
+        self.manifest_path = manifest_path
+        self.poll_seconds = poll_seconds
+        self.active = None
+        self.previous = deque(maxlen=keep_versions)
+        self.intra_op_threads = 0
+        self._lock = threading.Lock() # Serializes swaps / rollbacks, never taken by requests
+        self._manifest_mtime = None
+        self._thread = None
+        self._publish_metrics = False # Only workers report; see start_watching
+
+    def read_manifest(self):
+        """
+        Returns (version, {stage: path}). Missing manifest -> the default files.
+        Raises ValueError unless all three stages are listed and present on disk,
+        so a partial conversion can never be swapped in.
+        """
+        if not os.path.exists(self.manifest_path):
+            files = dict(DEFAULT_FILES)
+            manifest = {}
+        else:
+            with open(self.manifest_path, "r") as f:
+                manifest = json.load(f)
+            missing = [key for key in MANIFEST_STAGES if key not in manifest]
+            if missing:
+                raise ValueError(f"manifest is missing stages: {', '.join(missing)}")
+            base_dir = os.path.dirname(self.manifest_path)
+            files = {stage: os.path.join(base_dir, manifest[key]) for key, stage in MANIFEST_STAGES.items()}
+
+        absent = [path for path in files.values() if not os.path.exists(path)]
+        if absent:
+            raise ValueError(f"model files not found: {', '.join(absent)}")
+        return manifest.get("version") or self._content_version(files), files
+
+    def _content_version(self, files: dict) -> str:
+        """Manifests without a "version" field are versioned by their file contents."""
+        digest = hashlib.sha256()
+        for stage in sorted(files):
+            if os.path.exists(files[stage]):
+                with open(files[stage], "rb") as f:
+                    digest.update(f.read())
+        return digest.hexdigest()[:12]
+
+    def load_version(self, version: str, files: dict) -> ModelVersion:
+        options = session_options(self.intra_op_threads)
+        sessions = {}
+        for name, filename in files.items():
+            print(f"🔹 Loading {name} ({version}) from {filename}...")
+            sessions[name] = ort.InferenceSession(filename, sess_options=options)
+        model_version = ModelVersion(version, sessions, files)
+        model_version.warm_up()
+        return model_version
+
+    def load_initial(self, intra_op_threads: int = 0):
+        self.intra_op_threads = intra_op_threads
+        mtime = self._mtime()
+        version, files = self.read_manifest()
+        self._activate(self.load_version(version, files), "initial")
+        self._manifest_mtime = mtime
+
+    def _activate(self, model_version: ModelVersion, kind: str):
+        with self._lock:
+            old = self.active
+            self.active = model_version # Atomic: in-flight requests keep their reference
+            if old is not None:
+                self.previous.appendleft(old)
+                self._set_active_metric(old.version, 0)
+            self._set_active_metric(model_version.version, 1)
+        MODEL_SWAPS.labels(kind).inc()
+        print(f"✅ Serving model version {model_version.version} ({kind})")
+
+    def _set_active_metric(self, version: str, value: int):
+        # The preloading gunicorn master never swaps; a value set there would stay
+        # at 1 in the multiprocess files forever, so only workers write the gauge
+        if self._publish_metrics:
+            ACTIVE_VERSION.labels(version).set(value)
+
+    def request_rollback(self):
+        """
+        Points the manifest back at the most recent previous version. Every worker's
+        watcher then re-activates it from memory (the "reactivate" path), so the
+        whole task switches, not just the worker that took the call. Converted
+        models live in models/<version>/, so a worker that loads the rolled-back
+        manifest from disk gets that version's weights, not the latest ones.
+        Returns the target version, or None if nothing is loaded to go back to.
+        """
+        with self._lock:
+            if not self.previous:
+                return None
+            target = self.previous[0]
+
+        base_dir = os.path.dirname(self.manifest_path)
+        manifest = {key: os.path.relpath(target.files[stage], base_dir or ".")
+                    for key, stage in MANIFEST_STAGES.items()}
+        manifest["version"] = target.version
+
+        # Write-then-rename so watchers never read a half-written manifest
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=4)
+        os.replace(tmp_path, self.manifest_path)
+        MODEL_SWAPS.labels("rollback").inc()
+        print(f"↩️ Manifest rolled back to model version {target.version}")
+        return target.version
+
+    def versions(self):
+        return {
+            "active": self.active.version if self.active else None,
+            "previous": [v.version for v in self.previous],
+        }
+
+    def _mtime(self):
+        # Inode too: a rename within the same mtime tick still counts as a change
+        try:
+            stat = os.stat(self.manifest_path)
+            return stat.st_mtime_ns, stat.st_ino
+        except OSError:
+            return None
+
+    def check_for_update(self):
+        """
+        Loads + warms a new manifest version off the request path, then swaps it in.
+        The manifest's mtime is only remembered once that worked, so an unreadable
+        manifest or a missing file is retried on every poll until it is fixed.
+        """
+        mtime = self._mtime()
+        if mtime is None or mtime == self._manifest_mtime:
+            return
+        try:
+            version, files = self.read_manifest()
+            if self.active is None or version != self.active.version:
+                self._switch_to(version, files)
+            self._manifest_mtime = mtime
+        except Exception as e:
+            # Incomplete manifest or broken model: keep serving the current version
+            print(f"⚠️ Model update from {self.manifest_path} failed: {e}")
+
+    def _switch_to(self, version: str, files: dict):
+        # A version we rolled back from is still warm in memory
+        for old in self.previous:
+            if old.version == version:
+                with self._lock:
+                    self.previous.remove(old)
+                self._activate(old, "reactivate")
+                return
+        self._activate(self.load_version(version, files), "hot_swap")
+
+    def start_watching(self):
+        """Called per worker (lifespan), after fork: also where metrics start."""
+        self._publish_metrics = True
+        if self.active is not None:
+            self._set_active_metric(self.active.version, 1)
+        self._thread = threading.Thread(target=self._watch, name="model-registry", daemon=True)
+        self._thread.start()
+
+    def _watch(self):
+        # Check straight away: a worker respawned after a swap forks from the master,
+        # which still holds the version the image started with
+        while True:
+            self.check_for_update()
+            time.sleep(self.poll_seconds)
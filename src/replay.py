@@ -0,0 +1,107 @@
+import glob
+import json
+import os
+import time
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import requests
+
+# --- Configuration ---
+TARGET_URL = os.getenv("REPLAY_TARGET", "http://localhost:8000")
+CAPTURE_FILE = os.getenv("REPLAY_FILE", "captures/predict_capture.jsonl")
+SPEED = float(os.getenv("REPLAY_SPEED", 1.0))           # 1.0 = real time, 10.0 = 10x faster
+MODE = os.getenv("REPLAY_MODE", "open")                # "open" keeps recorded arrival times, "closed" sends back-to-back
+CONCURRENCY = int(os.getenv("REPLAY_CONCURRENCY", 32))  # Worker threads (max in-flight requests)
+TIMEOUT = float(os.getenv("REPLAY_TIMEOUT", 5.0))
+
+def capture_files(path):
+    """Every worker's file for a CAPTURE_FILE path (see src/capture.py worker_path)."""
+    root, ext = os.path.splitext(path)
+    files = sorted(glob.glob(f"{glob.escape(root)}.*{ext}"))
+    return files + [path] if os.path.exists(path) else files
+
+def load_capture(path):
+    """Reads the captures written by src/capture.py, merged and ordered by arrival time."""
+    records = []
+    for filename in capture_files(path):
+        with open(filename, "r", encoding="utf-8") as f:
+            records.extend(json.loads(line) for line in f if line.strip())
+    return sorted(records, key=lambda r: r["ts"])
+
+def replay(records):
+    """Re-sends each captured body and returns (record, latency_ms, status) tuples.
+
+    open:   each request is released at its recorded offset / SPEED, whether or not
+            earlier ones finished, so queueing in the target shows up as latency.
+    closed: CONCURRENCY workers send as fast as responses come back (max throughput).
+    """
+    session = requests.Session()
+    session.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=CONCURRENCY))
+    url = f"{TARGET_URL}/predict"
+    results = []
+    lock = threading.Lock()
+
+    def send(record, scheduled_at=None):
+        start = time.perf_counter()
+        try:
+            status = session.post(url, json=record["body"], timeout=TIMEOUT).status_code
+        except requests.RequestException:
+            status = 0
+        # In open mode, count time spent waiting for a free worker as latency too
+        begin = scheduled_at if scheduled_at is not None else start
+        with lock:
+            results.append((record, (time.perf_counter() - begin) * 1000, status))
+
+    with ThreadPoolExecutor(max_workers=CONCURRENCY) as pool:
+        if MODE == "closed":
+            for record in records:
+                pool.submit(send, record)
+        else:
+            first_ts = records[0]["ts"]
+            replay_start = time.perf_counter()
+            for record in records:
+                scheduled_at = replay_start + (record["ts"] - first_ts) / SPEED
+                delay = scheduled_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(send, record, scheduled_at)
+
+    return results
+
+def percentiles(latencies):
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+    return {"count": len(latencies), "p50": p50, "p90": p90, "p99": p99}
+
+def report(results, elapsed):
+    by_restaurant = defaultdict(list)
+    by_hour = defaultdict(list)
+    errors = 0
+    for record, latency_ms, status in results:
+        if status != 200:
+            errors += 1
+        by_restaurant[record["body"]["restaurant_id"]].append(latency_ms)
+        by_hour[record["body"]["hour_of_day"]].append(latency_ms)
+
+    overall = percentiles([r[1] for r in results])
+    print(f"\n📊 Replayed {len(results)} requests in {elapsed:.1f}s "
+          f"({len(results) / elapsed:.1f} req/s, mode={MODE}, speed={SPEED}x, errors={errors})")
+    print(f"   Overall: p50 {overall['p50']:.1f}ms | p90 {overall['p90']:.1f}ms | p99 {overall['p99']:.1f}ms")
+
+    for title, groups in (("Restaurant", by_restaurant), ("Hour", by_hour)):
+        print(f"\n{title:<12}{'count':>8}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}")
+        for key in sorted(groups):
+            p = percentiles(groups[key])
+            print(f"{str(key):<12}{p['count']:>8}{p['p50']:>10.1f}{p['p90']:>10.1f}{p['p99']:>10.1f}")
+
+if __name__ == "__main__":
+    records = load_capture(CAPTURE_FILE)
+    if not records:
+        print(f"❌ No captured requests in {CAPTURE_FILE}")
+        exit(1)
+
+    print(f"🔁 Replaying {len(records)} requests from {CAPTURE_FILE} against {TARGET_URL}...")
+    start = time.perf_counter()
+    results = replay(records)
+    report(results, time.perf_counter() - start)
@@ -0,0 +1,140 @@
+import asyncio
+import json
+import threading
+import time
+from prometheus_client import Counter, Gauge
+
+SHED = Counter('eta_requests_shed_total', 'Requests rejected with 503 by admission control', ['reason'])
+DEGRADED = Counter('eta_degraded_total', 'Predictions served without a live dependency', ['dependency', 'reason'])
+BREAKER_OPEN = Counter('eta_breaker_open_total', 'Calls short-circuited by an open circuit breaker', ['dependency'])
+BREAKER_STATE = Gauge('eta_breaker_state', 'Circuit breaker state (0 closed, 1 half-open, 2 open)', ['dependency'],
+                      multiprocess_mode='livemax')
+
+CLOSED, HALF_OPEN, OPEN = 0, 1, 2
+
+
+class Deadline:
+    """Per-request time budget, started when the request arrived (queue time counts)."""
+
+    def __init__(self, budget_ms: float, started_at: float = None):
+        self.expires_at = (started_at if started_at is not None else time.perf_counter()) + budget_ms / 1000
+
+    def remaining_ms(self) -> float:
+        return max((self.expires_at - time.perf_counter()) * 1000, 0.0)
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive failures, rejects calls for
+    reset_timeout seconds, then lets a single probe through (half-open).
+    """
+
+    def __init__(self, dependency: str, failure_threshold: int = 5, reset_timeout: float = 10.0):
+        self.dependency = dependency
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+        BREAKER_STATE.labels(dependency).set(CLOSED)
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._set_state(HALF_OPEN)
+                return True # This caller is the probe
+            if self._state == CLOSED:
+                return True
+        BREAKER_OPEN.labels(self.dependency).inc()
+        return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            if self._state != CLOSED:
+                self._set_state(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                if self._state != OPEN:
+                    print(f"⚠️ Circuit breaker OPEN for {self.dependency}")
+                self._set_state(OPEN)
+
+    def _set_state(self, state):
+        self._state = state
+        BREAKER_STATE.labels(self.dependency).set(state)
+
+
+class AdmissionLimiter:
+    """Caps concurrent requests; extra ones wait in a bounded queue or are shed."""
+
+    def __init__(self, max_concurrent: int, max_queue: int):
+        self.max_queue = max_queue
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._waiting = 0
+
+    async def acquire(self, timeout: float):
+        """Returns None when admitted, otherwise the shed reason."""
+        if self._semaphore.locked() and self._waiting >= self.max_queue:
+            return "queue_full"
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout)
+            return None
+        except asyncio.TimeoutError:
+            return "queue_timeout"
+        finally:
+            self._waiting -= 1
+
+    def release(self):
+        self._semaphore.release()
+
+
+class AdmissionMiddleware:
+    """Pure ASGI middleware putting AdmissionLimiter in front of /predict.
+
+    Runs on the event loop, before FastAPI hands the sync endpoint to a worker
+    thread, so a full queue is answered with 503 without touching the threadpool.
+    """
+
+    def __init__(self, app, limiter: AdmissionLimiter, budget_ms: float):
+        self.app = app
+        self.limiter = limiter
+        self.budget_ms = budget_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] != "/predict":
+            await self.app(scope, receive, send)
+            return
+
+        started_at = scope.setdefault("state", {}).setdefault("arrived_at", time.perf_counter())
+        deadline = Deadline(self.budget_ms, started_at)
+        scope["state"]["deadline"] = deadline
+
+        reason = await self.limiter.acquire(deadline.remaining_ms() / 1000)
+        if reason is not None:
+            SHED.labels(reason).inc()
+            await send_overloaded(send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.limiter.release()
+
+
+async def send_overloaded(send):
+    body = json.dumps({"detail": "Service overloaded, retry shortly."}).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": 503,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", b"1"),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,142 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+import numpy as np
+from prometheus_client import Gauge, Histogram
+
+# --- Configuration ---
+# Requests that can run at once before new ones queue (anyio's default threadpool size)
+WORKER_CAPACITY = int(os.getenv("SATURATION_CAPACITY", 40))
+LATENCY_SLO_MS = float(os.getenv("LATENCY_SLO_MS", 50))
+WAIT_BUDGET_MS = float(os.getenv("WAIT_BUDGET_MS", 10))
+WINDOW_SECONDS = float(os.getenv("SATURATION_WINDOW_SECONDS", 30))
+TICK_SECONDS = float(os.getenv("SATURATION_TICK_SECONDS", 5))
+# CloudWatch Embedded Metric Format: awslogs turns these stdout lines into metrics
+EMF_ENABLED = os.getenv("SATURATION_EMF", "false").lower() == "true"
+EMF_NAMESPACE = os.getenv("SATURATION_NAMESPACE", "ETAEngine")
+SERVICE_NAME = os.getenv("SERVICE_NAME", "eta-engine-service")
+
+INFLIGHT = Gauge('eta_inflight_requests', 'HTTP requests currently being handled', multiprocess_mode='livesum')
+WORKER_WAIT = Histogram('eta_worker_wait_seconds', 'Time /predict waited for a worker thread',
+                        buckets=(.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5))
+LATENCY_P95 = Gauge('eta_latency_p95_seconds', 'Rolling p95 /predict latency', multiprocess_mode='livemax')
+WAIT_P95 = Gauge('eta_worker_wait_p95_seconds', 'Rolling p95 worker wait', multiprocess_mode='livemax')
+SATURATION = Gauge('eta_saturation', 'Max of in-flight/capacity, wait p95/budget, latency p95/SLO (1.0 = saturated)',
+                   multiprocess_mode='livemax') # Most saturated worker
+
+
+class SaturationMonitor:
+    """Rolling latency / wait windows plus the combined saturation score."""
+
+    def __init__(self):
+        self._inflight = 0
+        self._latencies = deque() # (monotonic ts, ms)
+        self._waits = deque()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def request_started(self):
+        with self._lock:
+            self._inflight += 1
+        INFLIGHT.inc()
+
+    def request_finished(self, latency_ms: float = None):
+        now = time.monotonic()
+        with self._lock:
+            self._inflight -= 1
+            if latency_ms is not None:
+                self._latencies.append((now, latency_ms))
+        INFLIGHT.dec()
+
+    def record_wait(self, wait_ms: float):
+        WORKER_WAIT.observe(wait_ms / 1000)
+        with self._lock:
+            self._waits.append((time.monotonic(), wait_ms))
+
+    def snapshot(self):
+        """Trims the windows and returns the current signal values."""
+        cutoff = time.monotonic() - WINDOW_SECONDS
+        with self._lock:
+            for window in (self._latencies, self._waits):
+                while window and window[0][0] < cutoff:
+                    window.popleft()
+            latencies = [ms for _, ms in self._latencies]
+            waits = [ms for _, ms in self._waits]
+            inflight = self._inflight
+
+        latency_p95 = float(np.percentile(latencies, 95)) if latencies else 0.0
+        wait_p95 = float(np.percentile(waits, 95)) if waits else 0.0
+        saturation = max(inflight / WORKER_CAPACITY, wait_p95 / WAIT_BUDGET_MS, latency_p95 / LATENCY_SLO_MS)
+        return {
+            "InFlightRequests": inflight,
+            "WorkerWaitP95Ms": wait_p95,
+            "LatencyP95Ms": latency_p95,
+            "Saturation": saturation,
+        }
+
+    def start(self):
+        self._thread = threading.Thread(target=self._tick, name="saturation-monitor", daemon=True)
+        self._thread.start()
+
+    def _tick(self):
+        while True:
+            values = self.snapshot()
+            LATENCY_P95.set(values["LatencyP95Ms"] / 1000)
+            WAIT_P95.set(values["WorkerWaitP95Ms"] / 1000)
+            SATURATION.set(values["Saturation"])
+            if EMF_ENABLED:
+                print(json.dumps(emf_record(values)), flush=True)
+            time.sleep(TICK_SECONDS)
+
+
+def emf_record(values):
+    return {
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [{
+                "Namespace": EMF_NAMESPACE,
+                "Dimensions": [["ServiceName"]],
+                "Metrics": [
+                    {"Name": "Saturation", "Unit": "None"},
+                    {"Name": "InFlightRequests", "Unit": "Count"},
+                    {"Name": "WorkerWaitP95Ms", "Unit": "Milliseconds"},
+                    {"Name": "LatencyP95Ms", "Unit": "Milliseconds"},
+                ],
+            }],
+        },
+        "ServiceName": SERVICE_NAME,
+        **values,
+    }
+
+
+class SaturationMiddleware:
+    """Pure ASGI middleware: stamps arrival time and tracks in-flight /predict latency."""
+
+    def __init__(self, app, monitor: SaturationMonitor):
+        self.app = app
+        self.monitor = monitor
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] == "/metrics":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        scope.setdefault("state", {})["arrived_at"] = start
+        status = []
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status.append(message["status"])
+            await send(message)
+
+        self.monitor.request_started()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # Shed 503s return in microseconds; counting them would drag p95 down while overloaded
+            served = scope["path"] == "/predict" and status and status[0] != 503
+            latency_ms = (time.perf_counter() - start) * 1000 if served else None
+            self.monitor.request_finished(latency_ms)
@@ -0,0 +1,75 @@
+"""
+Preforked multi-worker server for the ETA engine.
+
+    WORKERS=4 python -m src.serve
+
+Gunicorn is the supervisor (restarts dead workers, graceful reloads) and each
+worker runs uvicorn. The app and the three ONNX sessions are loaded once in the
+master *before* fork, so workers share those read-only pages copy-on-write
+instead of each loading its own copy. Per-connection state (Redis pools,
+capture / saturation threads) is still created per worker in the lifespan, and
+each worker captures to its own file (CAPTURE_FILE with a .<pid> suffix),
+which src/replay.py merges back together.
+"""
+import gc
+import os
+import shutil
+
+# --- Configuration ---
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", 8000))
+WORKERS = int(os.getenv("WORKERS", 1))
+# prometheus_client reads this at import time, so it must be set before src.app is imported
+METRICS_DIR = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/eta_metrics")
+
+from gunicorn.app.base import BaseApplication
+from prometheus_client import multiprocess
+
+
+def reset_metrics_dir():
+    # Stale files from a previous run would be summed into the new metrics.
+    # Must run before the preload, which already creates metric files.
+    shutil.rmtree(METRICS_DIR, ignore_errors=True)
+    os.makedirs(METRICS_DIR, exist_ok=True)
+
+
+def pre_fork(server, worker):
+    # Move everything allocated so far out of the GC's reach, so collections in the
+    # workers don't write to (and un-share) the preloaded objects
+    gc.freeze()
+
+
+def child_exit(server, worker):
+    multiprocess.mark_process_dead(worker.pid)
+
+
+class ETAServer(BaseApplication):
+    def __init__(self, options):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from src.app import app, load_models
+
+        # One ORT thread per session: workers provide the parallelism, and a
+        # session created before fork must not own a thread pool
+        load_models(intra_op_threads=1)
+        return app
+
+
+if __name__ == "__main__":
+    reset_metrics_dir()
+    ETAServer({
+        "bind": f"{HOST}:{PORT}",
+        "workers": WORKERS,
+        "worker_class": "uvicorn.workers.UvicornWorker",
+        "preload_app": True,
+        "pre_fork": pre_fork,
+        "child_exit": child_exit,
+        "timeout": 30,
+        "graceful_timeout": 30,
+    }).run()
@@ -1,28 +1,34 @@
 import json
 import time
 import os
-import redis
-from kafka import KafkaConsumer
+from collections import defaultdict
+from kafka import KafkaConsumer, TopicPartition
+from src.feature_store import ShardedRedis
 
 # --- Configuration ---
 # Localhost because we are running this script from your machine, not inside Docker
 KAFKA_BROKER = os.getenv("KAFKA_BROKER", "localhost:9092")
-REDIS_HOST = os.getenv("REDIS_HOST", "localhost") 
-REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
+# Redis nodes come from REDIS_NODES (or REDIS_HOST/REDIS_PORT), see src/feature_store.py
 TOPIC_NAME = "order_events"
 
 # Window settings (from your architecture PDF)
 BUCKET_SIZE_SECONDS = 300  # 5 Minutes
 RETENTION_SECONDS = 3600   # Keep data for 1 hour, then expire
 
+# Bootstrap: rebuild the load:* windows from Kafka history before going live
+BOOTSTRAP_ON_START = os.getenv("BOOTSTRAP_ON_START", "false").lower() == "true"
+BOOTSTRAP_WRITE_BATCH = 5000 # Redis commands per pipelined round-trip
+# poll() returns {} instead of raising while the broker is down, so the replay needs its own limit
+BOOTSTRAP_TIMEOUT_SECONDS = float(os.getenv("BOOTSTRAP_TIMEOUT_SECONDS", 300))
+
 def get_redis_client():
-    """Connects to Redis with retries"""
+    """Connects to every Redis shard with retries"""
     r = None
     for i in range(5):
         try:
-            r = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, decode_responses=True)
-            r.ping() # Check connection
-            print(f"✅ Connected to Redis at {REDIS_HOST}:{REDIS_PORT}")
+            r = ShardedRedis.from_env(decode_responses=True)
+            r.ping() # Check connection to all nodes
+            print(f"✅ Connected to Redis at {r}")
             return r
         except Exception as e:
             print(f"⚠️ Redis connection failed (attempt {i+1}/5): {e}")
@@ -57,9 +63,131 @@ def calculate_bucket_key(restaurant_id, timestamp):
     bucket_start = int(timestamp // BUCKET_SIZE_SECONDS) * BUCKET_SIZE_SECONDS
     return f"load:{restaurant_id}:{bucket_start}"
 
+def new_windows():
+    """In-memory bucket store used during bootstrap: (restaurant_id, key) -> [count, last_event_ts]."""
+    return defaultdict(lambda: [0, 0.0])
+
+def aggregate_event(windows, event, now):
+    r_id = event.get("restaurant_id")
+    ts = event.get("timestamp")
+    if r_id and ts and ts >= now - RETENTION_SECONDS:
+        window = windows[(r_id, calculate_bucket_key(r_id, ts))]
+        window[0] += 1
+        window[1] = max(window[1], ts)
+
+def replay_history(consumer, now, timeout_seconds=BOOTSTRAP_TIMEOUT_SECONDS):
+    """
+    Seeks every partition to 'now - retention' and reads up to the current end
+    offsets, aggregating in memory instead of one INCR round-trip per event.
+    Returns {(restaurant_id, redis_key): [count, last_event_ts]}.
+    Raises TimeoutError if the end offsets are not reached within timeout_seconds.
+    """
+    partitions = consumer.partitions_for_topic(TOPIC_NAME) or set()
+    tps = [TopicPartition(TOPIC_NAME, p) for p in partitions]
+    consumer.assign(tps)
+
+    end_offsets = consumer.end_offsets(tps)
+    start_ms = int((now - RETENTION_SECONDS) * 1000)
+    start_offsets = consumer.offsets_for_times({tp: start_ms for tp in tps})
+    for tp in tps:
+        found = start_offsets.get(tp)
+        # No message newer than the retention window -> nothing to replay here
+        consumer.seek(tp, found.offset if found else end_offsets[tp])
+
+    windows = new_windows()
+    deadline = time.monotonic() + timeout_seconds
+    pending = {tp for tp in tps if consumer.position(tp) < end_offsets[tp]}
+    while pending:
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"replay did not finish within {timeout_seconds:.0f}s ({len(pending)} partitions behind)")
+        batches = consumer.poll(timeout_ms=1000, max_records=10000)
+        for tp, messages in batches.items():
+            for message in messages:
+                if message.offset >= end_offsets[tp]:
+                    break # Anything past the snapshot is handled by the live loop
+                aggregate_event(windows, message.value, now)
+        pending = {tp for tp in pending if consumer.position(tp) < end_offsets[tp]}
+
+    # Park every partition exactly at the snapshot so the commit hands off cleanly
+    for tp in tps:
+        consumer.seek(tp, end_offsets[tp])
+    return windows
+
+def bulk_load_windows(r, windows, now):
+    """
+    Writes rebuilt buckets with SET ... EX in a few pipelined round-trips per shard.
+    TTL matches the live path: RETENTION_SECONDS after the bucket's last event.
+    """
+    by_shard = defaultdict(list)
+    for (r_id, key), (count, last_ts) in windows.items():
+        by_shard[r.shard_index(r_id)].append((key, count, last_ts))
+
+    written = 0
+    for index, items in by_shard.items():
+        for i in range(0, len(items), BOOTSTRAP_WRITE_BATCH):
+            pipe = r.clients[index].pipeline(transaction=False)
+            for key, count, last_ts in items[i:i + BOOTSTRAP_WRITE_BATCH]:
+                ttl = int(last_ts + RETENTION_SECONDS - now)
+                if ttl > 0:
+                    pipe.set(key, count, ex=ttl)
+                    written += 1
+            pipe.execute()
+    return written
+
+def get_bootstrap_consumer():
+    """Connects an unsubscribed consumer (partitions are assigned manually) with retries"""
+    for i in range(5):
+        try:
+            consumer = KafkaConsumer(
+                bootstrap_servers=KAFKA_BROKER,
+                enable_auto_commit=False,
+                group_id='eta-feature-engine',
+                value_deserializer=lambda x: json.loads(x.decode('utf-8'))
+            )
+            return consumer
+        except Exception as e:
+            print(f"⚠️ Kafka connection failed (attempt {i+1}/5): {e}")
+            time.sleep(2)
+    return None
+
+def bootstrap_windows(r):
+    """Rebuilds load:* from the last hour of Kafka and commits the end offsets
+    so the live consumer group resumes exactly where the replay stopped.
+    The commit goes before the Redis writes: if it is rejected nothing has been
+    written, so the live consumer can't INCR events already in the SET counts.
+    Any failure is logged and the processor carries on in live mode."""
+    consumer = get_bootstrap_consumer()
+    if not consumer:
+        print("⚠️ Bootstrap skipped: Kafka not reachable. Starting in live mode with empty windows.")
+        return
+
+    try:
+        now = time.time()
+
+        print(f"⏪ Bootstrapping windows from the last {RETENTION_SECONDS}s of '{TOPIC_NAME}'...")
+        start = time.perf_counter()
+        windows = replay_history(consumer, now)
+        replay_sec = time.perf_counter() - start
+        events = sum(count for count, _ in windows.values())
+
+        consumer.commit()
+
+        start = time.perf_counter()
+        written = bulk_load_windows(r, windows, now)
+        write_sec = time.perf_counter() - start
+
+        print(f"✅ Rebuilt {written} buckets from {events} events | "
+              f"replay {replay_sec:.2f}s ({events / max(replay_sec, 1e-9):.0f} ev/s) | redis {write_sec:.2f}s")
+    except Exception as e:
+        print(f"⚠️ Bootstrap failed, continuing in live mode: {e}")
+    finally:
+        consumer.close()
+
 def process_stream():
     # 1. Connect to Infrastructure
     r = get_redis_client()
+    if r and BOOTSTRAP_ON_START:
+        bootstrap_windows(r)
     consumer = get_kafka_consumer()
     
     if not r or not consumer:
@@ -84,7 +212,8 @@ def process_stream():
             # 4. Atomic Update in Redis
             # INCR: Adds 1 to the counter (Thread-safe)
             # EXPIRE: Ensures the key deletes itself after 1 hour (Memory Management)
-            pipe = r.pipeline()
+            # All of a restaurant's buckets live on one shard
+            pipe = r.client_for(r_id).pipeline()
             pipe.incr(redis_key)
             pipe.expire(redis_key, RETENTION_SECONDS)
             result = pipe.execute()
@@ -0,0 +1,49 @@
+"""
+Measures how long the stream processor bootstrap takes to rebuild one hour of
+peak traffic: in-memory aggregation + pipelined bulk load into a local Redis.
+Kafka fetch time is not included (run the processor with BOOTSTRAP_ON_START=true
+against a real broker for the end-to-end number; it logs the same breakdown).
+
+    python -m tests.bench_bootstrap
+"""
+import os
+import random
+import time
+from src.stream_processor import (
+    RETENTION_SECONDS, get_redis_client, new_windows, aggregate_event, bulk_load_windows
+)
+
+PEAK_ORDERS_PER_SEC = int(os.getenv("BENCH_PEAK_RPS", 50))
+NUM_RESTAURANTS = int(os.getenv("BENCH_RESTAURANTS", 1000))
+
+if __name__ == "__main__":
+    r = get_redis_client()
+    if not r:
+        print("❌ Redis is not running on REDIS_HOST:REDIS_PORT")
+        exit(1)
+
+    now = time.time()
+    total = PEAK_ORDERS_PER_SEC * RETENTION_SECONDS
+    restaurant_ids = [f"BENCH_{i}" for i in range(NUM_RESTAURANTS)]
+    events = [
+        {"restaurant_id": random.choice(restaurant_ids), "timestamp": now - RETENTION_SECONDS + i / PEAK_ORDERS_PER_SEC}
+        for i in range(total)
+    ]
+    print(f"🔹 {total} events ({PEAK_ORDERS_PER_SEC}/s for {RETENTION_SECONDS}s) across {NUM_RESTAURANTS} restaurants")
+
+    start = time.perf_counter()
+    windows = new_windows()
+    for event in events:
+        aggregate_event(windows, event, now)
+    aggregate_sec = time.perf_counter() - start
+
+    start = time.perf_counter()
+    written = bulk_load_windows(r, windows, now)
+    write_sec = time.perf_counter() - start
+
+    print(f"✅ Aggregated in {aggregate_sec:.2f}s ({total / aggregate_sec:.0f} ev/s)")
+    print(f"✅ Wrote {written} buckets in {write_sec:.2f}s")
+    print(f"   Total rebuild: {aggregate_sec + write_sec:.2f}s")
+
+    for r_id, key in windows:
+        r.client_for(r_id).delete(key)
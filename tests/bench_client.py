@@ -0,0 +1,48 @@
+"""
+Closed-loop /predict load shared by the bench_* scripts.
+
+Each user thread keeps one requests.Session and sends the next request as soon
+as the previous one returns, until `stop` is set.
+"""
+import random
+import threading
+import time
+import requests
+
+def payload(jitter_coords=False):
+    """A random order; jitter_coords varies the route so OSRM is called (not cached) each time."""
+    spread = 0.01 if jitter_coords else 0.0
+    return {
+        "restaurant_id": f"REST_{random.randint(1, 5)}",
+        "start_lat": 8.5241 + random.uniform(-spread, spread),
+        "start_lon": 76.9366 + random.uniform(-spread, spread),
+        "end_lat": 8.5341 + random.uniform(-spread, spread),
+        "end_lon": 76.9466 + random.uniform(-spread, spread),
+        "items_count": random.randint(1, 10),
+        "cuisine_complexity": 1.2,
+        "rider_supply_index": 1.0,
+        "hour_of_day": random.randint(10, 22),
+        "day_of_week": 4
+    }
+
+def user(url, stop, on_response=None, jitter_coords=False, timeout=10):
+    """
+    Posts to {url}/predict until stop is set. on_response(started_at, latency_ms, resp)
+    is called after every request; resp is None when the request itself failed.
+    """
+    session = requests.Session()
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            resp = session.post(f"{url}/predict", json=payload(jitter_coords), timeout=timeout)
+        except requests.RequestException:
+            resp = None
+        if on_response is not None:
+            on_response(start, (time.perf_counter() - start) * 1000, resp)
+
+def start_users(count, url, stop, **kwargs):
+    """Starts `count` daemon user threads and returns them."""
+    threads = [threading.Thread(target=user, args=(url, stop), kwargs=kwargs, daemon=True) for _ in range(count)]
+    for t in threads:
+        t.start()
+    return threads
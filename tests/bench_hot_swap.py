@@ -0,0 +1,73 @@
+"""
+Prediction latency across a model hot-swap.
+
+Start the app with a short poll interval, e.g.:
+    MANIFEST_POLL_SECONDS=1 uvicorn src.app:app --port 8000
+
+Then:
+    python -m tests.bench_hot_swap
+
+Drives steady closed-loop load, bumps the "version" in onnx_manifest.json
+halfway through (same model files, so only the swap itself is measured), and
+prints per-second p50/p99 plus the active version seen in the responses.
+The original manifest is restored at the end.
+"""
+import json
+import os
+import shutil
+import threading
+import time
+from collections import defaultdict
+import numpy as np
+from tests.bench_client import start_users
+
+TARGET_URL = os.getenv("BENCH_TARGET", "http://localhost:8000")
+MANIFEST = os.getenv("MODEL_MANIFEST", "onnx_manifest.json")
+CLIENT_THREADS = int(os.getenv("BENCH_THREADS", 8))
+BENCH_SECONDS = int(os.getenv("BENCH_SECONDS", 30))
+
+if __name__ == "__main__":
+    stop = threading.Event()
+    samples = defaultdict(list)   # second -> latencies (ms)
+    versions = defaultdict(set)   # second -> model versions seen
+    failures = []
+    lock = threading.Lock()
+    t0 = time.perf_counter()
+
+    def on_response(started_at, latency_ms, resp):
+        second = int(started_at - t0)
+        with lock:
+            if resp is None or resp.status_code != 200:
+                failures.append(resp.status_code if resp is not None else "error")
+                return
+            samples[second].append(latency_ms)
+            versions[second].add(resp.json()["live_context"].get("model_version"))
+
+    backup = MANIFEST + ".bak"
+    shutil.copy(MANIFEST, backup)
+    threads = start_users(CLIENT_THREADS, TARGET_URL, stop, on_response=on_response)
+    try:
+        time.sleep(BENCH_SECONDS / 2)
+        with open(backup) as f:
+            manifest = json.load(f)
+        manifest["version"] = f"bench-{int(time.time())}"
+        with open(MANIFEST, "w") as f:
+            json.dump(manifest, f, indent=4)
+        swap_second = int(time.perf_counter() - t0)
+        print(f"🔄 Published version {manifest['version']} at t={swap_second}s")
+        time.sleep(BENCH_SECONDS / 2)
+    finally:
+        stop.set()
+        for t in threads:
+            t.join()
+        shutil.move(backup, MANIFEST)
+
+    print(f"\n{'t (s)':>6}{'req':>6}{'p50 ms':>9}{'p99 ms':>9}  versions")
+    for second in sorted(samples):
+        p50, p99 = np.percentile(samples[second], [50, 99])
+        print(f"{second:>6}{len(samples[second]):>6}{p50:>9.1f}{p99:>9.1f}  {', '.join(sorted(map(str, versions[second])))}")
+
+    before = [ms for s, v in samples.items() if s < swap_second for ms in v]
+    after = [ms for s, v in samples.items() if s >= swap_second for ms in v]
+    print(f"\n📊 p99 before swap {np.percentile(before, 99):.1f}ms | from swap on {np.percentile(after, 99):.1f}ms | "
+          f"non-200 responses: {len(failures)}")
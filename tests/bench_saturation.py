@@ -0,0 +1,69 @@
+"""
+Local load test: does eta_saturation flag overload before CPU does?
+
+Start the app I/O-bound, the way it runs on ECS (OSRM slow to answer), e.g.:
+    OSRM_STUB_DELAY_MS=200 python -m tests.osrm_stub
+    SATURATION_TICK_SECONDS=1 OSRM_HOST=http://localhost:5000 REQUEST_DEADLINE_MS=5000 \
+        uvicorn src.app:app --port 8000
+
+OSRM has to be slow but answering: an unreachable host opens the OSRM circuit
+breaker after BREAKER_FAILURES calls and every request then returns a fast
+fallback, so nothing ever saturates. The long deadline keeps requests waiting
+on OSRM instead of skipping it once the budget runs low.
+
+Then:
+    python -m tests.bench_saturation
+
+Concurrency is stepped up every STEP_SECONDS. Each second the script scrapes
+/metrics and prints saturation next to process CPU, and finally reports the
+step at which each signal first crossed its scaling target.
+"""
+import os
+import re
+import threading
+import time
+import requests
+from tests.bench_client import start_users
+
+TARGET_URL = os.getenv("BENCH_TARGET", "http://localhost:8000")
+STEPS = [int(x) for x in os.getenv("BENCH_STEPS", "5,10,20,40,60,80").split(",")]
+STEP_SECONDS = int(os.getenv("BENCH_STEP_SECONDS", 15))
+SATURATION_TARGET = 0.7
+CPU_TARGET = 70.0
+
+stop = threading.Event()
+
+def scrape():
+    text = requests.get(f"{TARGET_URL}/metrics", timeout=2).text
+    def value(name):
+        match = re.search(rf"^{name} ([0-9.e+-]+)$", text, re.MULTILINE)
+        return float(match.group(1)) if match else 0.0
+    return value("eta_saturation"), value("process_cpu_seconds_total"), value("eta_inflight_requests")
+
+if __name__ == "__main__":
+    users = []
+    first_cross = {"saturation": None, "cpu": None}
+    _, last_cpu, _ = scrape()
+    last_t = time.monotonic()
+
+    print(f"{'users':>6}{'saturation':>12}{'cpu %':>8}{'inflight':>10}")
+    for step in STEPS:
+        # Fresh coordinates on every request keep the route cache from absorbing the OSRM calls
+        users += start_users(step - len(users), TARGET_URL, stop, jitter_coords=True)
+
+        for _ in range(STEP_SECONDS):
+            time.sleep(1)
+            saturation, cpu_total, inflight = scrape()
+            now = time.monotonic()
+            cpu_pct = (cpu_total - last_cpu) / (now - last_t) * 100
+            last_cpu, last_t = cpu_total, now
+            print(f"{step:>6}{saturation:>12.2f}{cpu_pct:>8.1f}{inflight:>10.0f}")
+
+            if first_cross["saturation"] is None and saturation >= SATURATION_TARGET:
+                first_cross["saturation"] = step
+            if first_cross["cpu"] is None and cpu_pct >= CPU_TARGET:
+                first_cross["cpu"] = step
+
+    stop.set()
+    print(f"\n📊 Saturation crossed {SATURATION_TARGET} at {first_cross['saturation']} users")
+    print(f"📊 CPU crossed {CPU_TARGET}% at {first_cross['cpu']} users (None = never)")
@@ -0,0 +1,92 @@
+"""
+Local multi-instance check + throughput comparison for the sharded feature store.
+
+Start a few Redis instances first, e.g.:
+    for p in 6379 6380 6381 6382; do redis-server --port $p --save "" --daemonize yes; done
+
+Then:
+    BENCH_NODES=localhost:6379,localhost:6380,localhost:6381,localhost:6382 python -m tests.bench_sharding
+
+Runs the same mixed workload (processor INCR+EXPIRE pipelines, app-style
+per-restaurant MGETs and /restaurant_loads-style batched reads grouped per
+shard) against the first node alone and against all nodes.
+"""
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from src.feature_store import ShardedRedis, parse_nodes
+
+NODES = parse_nodes(os.getenv("BENCH_NODES", "localhost:6379,localhost:6380,localhost:6381,localhost:6382"))
+THREADS = int(os.getenv("BENCH_THREADS", 64))
+OPS_PER_THREAD = int(os.getenv("BENCH_OPS", 2000))
+NUM_RESTAURANTS = 1000
+BATCH_RESTAURANTS = 20 # Restaurants per batched read
+BUCKET_SIZE = 300
+
+def restaurant_keys(r_id, now):
+    bucket = (now // BUCKET_SIZE) * BUCKET_SIZE
+    return [f"load:{r_id}:{bucket - i * BUCKET_SIZE}" for i in range(4)] + [f"simulation:{r_id}"]
+
+def check_colocation(store):
+    """Every key of a restaurant must land on the shard chosen for that restaurant."""
+    now = int(time.time())
+    for i in range(NUM_RESTAURANTS):
+        r_id = f"BENCH_{i}"
+        pipe = store.client_for(r_id).pipeline()
+        for key in restaurant_keys(r_id, now):
+            pipe.set(key, 1, ex=60)
+        pipe.execute()
+
+    for i in range(NUM_RESTAURANTS):
+        r_id = f"BENCH_{i}"
+        for index, client in enumerate(store.clients):
+            found = client.exists(*restaurant_keys(r_id, now))
+            expected = 5 if index == store.shard_index(r_id) else 0
+            assert found == expected, f"{r_id}: {found} keys on shard {index}, expected {expected}"
+
+    spread = [0] * len(store.clients)
+    for i in range(NUM_RESTAURANTS):
+        spread[store.shard_index(f"BENCH_{i}")] += 1
+    print(f"✅ Colocation OK | restaurants per shard: {spread}")
+
+def worker(store):
+    now = int(time.time())
+    for _ in range(OPS_PER_THREAD):
+        r_id = f"BENCH_{random.randrange(NUM_RESTAURANTS)}"
+        op = random.random()
+        if op < 0.1:
+            r_ids = [f"BENCH_{random.randrange(NUM_RESTAURANTS)}" for _ in range(BATCH_RESTAURANTS)]
+            store.mget_per_restaurant({r: restaurant_keys(r, now) for r in r_ids})
+        elif op < 0.55:
+            key = restaurant_keys(r_id, now)[0]
+            pipe = store.client_for(r_id).pipeline()
+            pipe.incr(key)
+            pipe.expire(key, 60)
+            pipe.execute()
+        else:
+            store.client_for(r_id).mget(restaurant_keys(r_id, now))
+
+def throughput(store):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=THREADS) as pool:
+        futures = [pool.submit(worker, store) for _ in range(THREADS)]
+        for future in futures:
+            future.result() # Surface Redis errors instead of counting failed ops
+    return THREADS * OPS_PER_THREAD / (time.perf_counter() - start)
+
+if __name__ == "__main__":
+    sharded = ShardedRedis(NODES, decode_responses=True, max_connections=THREADS)
+    single = ShardedRedis(NODES[:1], decode_responses=True, max_connections=THREADS)
+    sharded.ping()
+
+    check_colocation(sharded)
+
+    single_ops = throughput(single)
+    sharded_ops = throughput(sharded)
+    print(f"📊 1 node:  {single_ops:,.0f} ops/s")
+    print(f"📊 {len(NODES)} nodes: {sharded_ops:,.0f} ops/s ({sharded_ops / single_ops:.2f}x)")
+
+    for client in sharded.clients:
+        for key in client.scan_iter("*BENCH_*"):
+            client.delete(key)
@@ -0,0 +1,84 @@
+"""
+Throughput and memory per worker count for src/serve.py (Linux only: reads /proc).
+
+    python -m tests.bench_workers
+
+For each WORKERS value the server is started on a free port, driven closed-loop
+for BENCH_SECONDS, and every worker's RSS and PSS are read. PSS splits shared
+pages between the processes that map them, so a flat PSS while RSS stays put
+shows the preloaded models really are shared.
+"""
+import os
+import subprocess
+import sys
+import threading
+import time
+import requests
+from tests.bench_client import start_users
+
+WORKER_COUNTS = [int(x) for x in os.getenv("BENCH_WORKERS", "1,2,4").split(",")]
+CLIENT_THREADS = int(os.getenv("BENCH_THREADS", 32))
+BENCH_SECONDS = int(os.getenv("BENCH_SECONDS", 20))
+PORT = int(os.getenv("BENCH_PORT", 8010))
+
+def memory_kb(pid):
+    """(RSS, PSS) in kB from /proc/<pid>/smaps_rollup."""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ("Rss:", "Pss:"):
+                values[parts[0]] = int(parts[1])
+    return values["Rss:"], values["Pss:"]
+
+def worker_pids(master_pid):
+    with open(f"/proc/{master_pid}/task/{master_pid}/children") as f:
+        return [int(pid) for pid in f.read().split()]
+
+def wait_ready(url, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(f"{url}/debug_files", timeout=1).ok:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    return False
+
+def drive(url):
+    stop = threading.Event()
+    done = []
+
+    def on_response(started_at, latency_ms, resp):
+        if resp is not None and resp.status_code == 200:
+            done.append(1) # list.append is atomic, no lock needed
+
+    threads = start_users(CLIENT_THREADS, url, stop, on_response=on_response)
+    time.sleep(BENCH_SECONDS)
+    stop.set()
+    for t in threads:
+        t.join()
+    return len(done) / BENCH_SECONDS
+
+if __name__ == "__main__":
+    url = f"http://127.0.0.1:{PORT}"
+    print(f"{'workers':>8}{'req/s':>10}{'RSS/worker MB':>16}{'PSS/worker MB':>16}{'master RSS MB':>15}")
+    for workers in WORKER_COUNTS:
+        env = {**os.environ, "WORKERS": str(workers), "PORT": str(PORT), "HOST": "127.0.0.1"}
+        server = subprocess.Popen([sys.executable, "-m", "src.serve"], env=env,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            if not wait_ready(url):
+                print(f"❌ Server with {workers} workers did not come up")
+                continue
+            rps = drive(url)
+            pids = worker_pids(server.pid)
+            mem = [memory_kb(pid) for pid in pids]
+            rss = sum(m[0] for m in mem) / len(mem) / 1024
+            pss = sum(m[1] for m in mem) / len(mem) / 1024
+            master_rss = memory_kb(server.pid)[0] / 1024
+            print(f"{workers:>8}{rps:>10.0f}{rss:>16.1f}{pss:>16.1f}{master_rss:>15.1f}")
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
@@ -0,0 +1,34 @@
+"""
+Slow but healthy OSRM stand-in for load tests.
+
+    OSRM_STUB_DELAY_MS=200 python -m tests.osrm_stub
+
+Answers every /route request with a fixed route after OSRM_STUB_DELAY_MS, so
+the app is I/O-bound the way it is on ECS while the OSRM breaker stays closed
+(a blackhole host would trip it and turn every request into a fast fallback).
+"""
+import json
+import os
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PORT = int(os.getenv("OSRM_STUB_PORT", 5000))
+DELAY_MS = float(os.getenv("OSRM_STUB_DELAY_MS", 200))
+ROUTE = {"code": "Ok", "routes": [{"distance": 5000.0, "duration": 900.0}]}
+
+class SlowRouteHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        time.sleep(DELAY_MS / 1000)
+        body = json.dumps(ROUTE).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass # One line per request would drown the bench output
+
+if __name__ == "__main__":
+    print(f"🐢 OSRM stub on :{PORT}, answering after {DELAY_MS:.0f}ms")
+    ThreadingHTTPServer(("0.0.0.0", PORT), SlowRouteHandler).serve_forever()